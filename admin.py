@@ -0,0 +1,73 @@
+import argparse
+import getpass
+import sys
+from backend import *
+
+# 관리자용 명령줄 도구
+# 백업 파일에는 모든 사용자의 일기가 들어 있고, 복원하면 모든 사용자의 데이터가 백업 시점으로 바뀝니다.
+# 그래서 일기장 화면이 아니라 서버에 접속할 수 있는 사람만 이 도구로 백업/복원합니다.
+# 예: python admin.py backup / python admin.py list / python admin.py restore backups/mindtalk_diary_20250101_030000.db
+# 빈 페이지 반납(auto_vacuum)이 꺼진 예전 DB는 한가한 때에 python admin.py vacuum으로 한 번 바꿔 줍니다.
+# 일기장 비밀번호를 잊은 사용자는 python admin.py set-password <일기장 이름>으로 새 비밀번호를 정해 줍니다.
+
+def command_backup(args):
+    path = create_backup_db()
+    if not path:
+        return 1
+    print(path)
+    return 0
+
+def command_list(args):
+    for backup in list_backups():
+        print(f"{backup['path']}\t{backup['created_at']}\t{backup['size'] / 1024 / 1024:.1f}MB")
+    return 0
+
+def command_restore(args):
+    if not args.yes:
+        answer = input(f"모든 사용자의 일기와 설정이 {args.path} 백업 시점으로 바뀝니다. 계속할까요? (y/N) ")
+        if answer.strip().lower() != "y":
+            return 1
+    return 0 if restore_backup_db(args.path) else 1
+
+def command_vacuum(args):
+    return 0 if enable_incremental_vacuum_db() else 1
+
+def command_set_password(args):
+    user_id = normalize_user_id(args.name)
+    if user_id == DEFAULT_USER_ID:
+        print("공용 일기장은 APP_PASSWORD로 들어갑니다.")
+        return 1
+    password = getpass.getpass(f"'{user_id}' 일기장의 새 비밀번호: ")
+    if len(password) < DIARY_PASSWORD_MIN_LENGTH:
+        print(f"비밀번호는 {DIARY_PASSWORD_MIN_LENGTH}자 이상이어야 합니다.")
+        return 1
+    if getpass.getpass("한 번 더 입력하세요: ") != password:
+        print("두 비밀번호가 다릅니다.")
+        return 1
+    return 0 if save_password_hash_to_db(user_id, hash_password(password), replace=True) else 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="마음톡 DB 백업/복원/정리/일기장 비밀번호 (SQLite 저장소 전용)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backup", help="지금 DB를 백업합니다").set_defaults(func=command_backup)
+    commands.add_parser("list", help="보관 중인 백업을 최신순으로 보여줍니다").set_defaults(func=command_list)
+    restore_parser = commands.add_parser("restore", help="백업 파일로 DB 전체를 되돌립니다")
+    restore_parser.add_argument("path")
+    restore_parser.add_argument("--yes", action="store_true", help="확인 질문 없이 바로 복원합니다")
+    restore_parser.set_defaults(func=command_restore)
+    password_parser = commands.add_parser("set-password", help="일기장 비밀번호를 새로 정합니다")
+    password_parser.add_argument("name")
+    password_parser.set_defaults(func=command_set_password)
+    commands.add_parser("vacuum", help="예전 DB를 auto_vacuum INCREMENTAL 모드로 바꿉니다 (파일 전체를 다시 씁니다)").set_defaults(func=command_vacuum)
+
+    args = parser.parse_args(argv)
+    if storage.name != "sqlite":
+        print("PostgreSQL 저장소는 서버의 백업 도구로 관리하세요.")
+        return 1
+    # 정기 점검/휴지통 정리 스레드와 OpenAI 확인 없이 DB(마이그레이션, 쓰기 스레드)만 엽니다.
+    if not open_database():
+        return 1
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
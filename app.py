@@ -13,6 +13,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# DB와 백그라운드 스레드는 프로세스마다 한 번만 시작되고, 다시 실행될 때는 바로 넘어갑니다.
+start_background_services()
+if not start_openai_client():
+    st.stop()
+
 def main():
     if 'app_initialized' not in st.session_state:
         init_session_state()
@@ -23,8 +28,18 @@ def main():
         mood_map = {"good": "좋음", "normal": "보통", "bad": "나쁨"}
         mood_value = query_params.get("mood")
         if mood_value in mood_map:
-            # 인증 상태를 True로 설정하고, 선택된 기분으로 채팅 단계를 시작합니다.
-            st.session_state.authenticated = True
+            # 이미 로그인한 세션이면 링크의 user는 무시하고 지금 일기장을 그대로 씁니다.
+            # 새 세션이면 서명이 맞는 링크일 때만 그 일기장으로 로그인합니다.
+            # (새 기분으로 새 대화를 시작하는 것이므로 저장 안 된 대화는 이어 붙이지 않습니다)
+            if st.session_state.get("authenticated", False):
+                st.session_state.draft_id = None
+            elif verify_mood_link(query_params.get("user", DEFAULT_USER_ID), query_params.get("sig", "")):
+                login_user(query_params.get("user", DEFAULT_USER_ID), resume_draft=False)
+            else:
+                st.query_params.clear()
+                st.warning("링크가 만료됐어요. 다시 로그인해주세요.")
+
+        if mood_value in mood_map and st.session_state.get("authenticated", False):
             st.session_state.current_mood = mood_map[mood_value]
             st.session_state.current_step = "chat"
             st.session_state.chat_messages = []
@@ -49,6 +64,9 @@ def main():
         show_login()
         return
 
+    # 다른 탭/기기에서 바뀐 일기를 변경 기록으로 반영합니다. (바뀐 게 없으면 PRAGMA 한 번으로 끝납니다)
+    refresh_session_entries_if_stale()
+
     # 라우팅: 현재 단계에 맞는 화면을 보여줍니다.
     if st.session_state.current_step == "mood_selection":
         show_mood_selection()
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 테스트는 현재 폴더의 mindtalk_diary.db를 열고 쓰기 스레드만 띄웁니다. (정기 점검/휴지통 정리 스레드와 OpenAI는 쓰지 않습니다)
+# 저장소 폴더에 DB 파일이 생기지 않도록 테스트는 임시 폴더에서 돌립니다. (SQLite 저장소만 씁니다)
+os.environ.pop("MINDTALK_DATABASE_URL", None)
+os.chdir(tempfile.mkdtemp(prefix="mindtalk-tests-"))
+
+import backend  # noqa: E402
+
+backend.open_database()
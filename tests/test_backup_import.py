@@ -0,0 +1,89 @@
+import sqlite3
+from datetime import datetime
+
+import backend
+
+OWNER = "backup-owner"
+READER = "backup-reader"
+
+
+def make_entry(date, summary):
+    return {
+        'date': date,
+        'time': '10:00',
+        'mood': '보통',
+        'summary': summary,
+        'keywords': ['#차분'],
+        'suggested_keywords': ['#차분', '#일상'],
+        'action_items': ['푹 쉬어요'],
+        'chat_messages': [
+            {'role': 'user', 'content': f'{summary} 이야기'},
+            {'role': 'assistant', 'content': '그랬군요.'}
+        ]
+    }
+
+
+def import_backup(path, user_id):
+    return backend.storage.import_diaries(user_id, lambda: backend.iter_import_entries(path, "sqlite", user_id))
+
+
+def test_backup_import_keeps_archived_diaries():
+    today = datetime.now().strftime('%Y-%m-%d')
+    for date, summary in [('2001-01-01', '오래된 일기 하나'), ('2001-01-02', '오래된 일기 둘'), (today, '오늘 일기')]:
+        assert backend.storage.save_diary(OWNER, make_entry(date, summary))
+    assert backend.archive_old_diaries_db() >= 2
+
+    path = backend.create_backup_db()
+    assert path
+    # 백업 속 일기를 다른 일기장 것으로 바꿔서, 그 일기장으로 처음 가져오는 상황을 만듭니다.
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM diary_archive WHERE user_id = ?', (OWNER,)).fetchone()[0] == 2
+        for table in ('diary_entries', 'diary_archive'):
+            conn.execute(f'UPDATE {table} SET user_id = ? WHERE user_id = ?', (READER, OWNER))
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert import_backup(path, READER) == {'imported': 3, 'duplicates': 0, 'skipped': 0}
+
+    diaries = backend.storage.load_diaries_in_range(READER, '2000-01-01', '2100-01-01')
+    assert [diary['summary'] for diary in diaries] == ['오래된 일기 하나', '오래된 일기 둘', '오늘 일기']
+    for diary in diaries:
+        messages = backend.storage.load_chat_messages(READER, diary['id'])
+        assert messages[0] == {'role': 'user', 'content': f"{diary['summary']} 이야기"}
+        assert diary['suggested_keywords'] == ['#차분', '#일상']
+
+    # 같은 파일을 다시 가져오면 모두 이미 있는 일기로 건너뜁니다.
+    assert import_backup(path, READER) == {'imported': 0, 'duplicates': 3, 'skipped': 0}
+
+
+def test_jsonl_import_runs_as_several_writer_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "IMPORT_BATCH_SIZE", 2)
+    path = tmp_path / "diaries.jsonl"
+    lines = [
+        '{"date": "2024-05-0%d", "time": "09:00", "mood": "좋음", "summary": "가져온 일기 %d"}' % (day, day)
+        for day in range(1, 6)
+    ]
+    path.write_text("\n".join(lines + ["not json"]), encoding="utf-8")
+    submitted = backend.db_writer.stats()["submitted"]
+
+    result = backend.storage.import_diaries("jsonl-reader", lambda: backend.iter_import_entries(str(path), "jsonl", "jsonl-reader"))
+
+    assert result == {'imported': 5, 'duplicates': 0, 'skipped': 1}
+    assert backend.db_writer.stats()["submitted"] - submitted == 3
+    assert len(backend.storage.search_diaries("jsonl-reader", "가져온")) == 5
+
+
+def test_import_skips_diaries_saved_while_the_file_is_read(tmp_path):
+    path = tmp_path / "race.jsonl"
+    path.write_text('{"date": "2024-07-01", "time": "10:00", "mood": "보통", "summary": "동시에 들어온 일기"}\n', encoding="utf-8")
+
+    # 파일을 읽는 사이에 다른 세션(또는 같은 파일의 다른 가져오기)이 같은 일기를 먼저 저장합니다.
+    def open_entries():
+        for entry in backend.iter_import_entries(str(path), "jsonl", "race-reader"):
+            assert backend.storage.save_diary("race-reader", make_entry(entry['date'], entry['summary']))
+            yield entry
+
+    assert backend.storage.import_diaries("race-reader", open_entries) == {'imported': 0, 'duplicates': 1, 'skipped': 0}
+    assert len(backend.storage.search_diaries("race-reader", "동시에")) == 1
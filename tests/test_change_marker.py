@@ -0,0 +1,25 @@
+import threading
+
+import backend
+
+
+def marker_from_another_thread():
+    result = []
+    thread = threading.Thread(target=lambda: result.append(backend.storage.load_change_marker()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_change_marker_is_the_same_on_every_connection_until_a_diary_changes():
+    marker = backend.storage.load_change_marker()
+    assert marker_from_another_thread() == marker
+
+    assert backend.storage.save_diary("marker-owner", {
+        'date': '2024-08-01', 'time': '07:00', 'mood': '좋음', 'summary': '표시 바꾸는 일기',
+        'keywords': [], 'suggested_keywords': [], 'action_items': [], 'chat_messages': []
+    })
+
+    changed = backend.storage.load_change_marker()
+    assert changed != marker
+    assert marker_from_another_thread() == changed
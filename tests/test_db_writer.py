@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+import backend
+
+
+@pytest.fixture
+def probe_table():
+    backend.db_writer.execute(lambda cursor: cursor.execute('CREATE TABLE IF NOT EXISTS writer_probe (name TEXT)'))
+    backend.db_writer.execute(lambda cursor: cursor.execute('DELETE FROM writer_probe'))
+
+
+def probe_count(name):
+    return backend.get_db_connection().execute('SELECT COUNT(*) FROM writer_probe WHERE name = ?', (name,)).fetchone()[0]
+
+
+def insert_probe(name):
+    return lambda cursor: cursor.execute('INSERT INTO writer_probe (name) VALUES (?)', (name,))
+
+
+# 쓰기 스레드가 release될 때까지 느린 작업 하나를 붙잡고 있게 합니다.
+def hold_writer(release):
+    started = threading.Event()
+
+    def slow_job(cursor):
+        started.set()
+        release.wait(5)
+
+    backend.db_writer.submit(slow_job)
+    assert started.wait(5)
+
+
+def test_timed_out_write_is_cancelled_and_never_committed(probe_table):
+    release = threading.Event()
+    hold_writer(release)
+    cancelled = backend.db_writer.stats()["cancelled"]
+
+    with pytest.raises(FutureTimeoutError):
+        backend.db_writer.execute(insert_probe("late"), timeout=0.2)
+
+    release.set()
+    # 뒤에 넣은 작업이 끝났으면 앞에 있던 작업도 모두 처리된 것입니다.
+    backend.db_writer.execute(insert_probe("after"))
+    assert probe_count("late") == 0
+    assert probe_count("after") == 1
+    assert backend.db_writer.stats()["cancelled"] == cancelled + 1
+
+
+def test_running_write_is_awaited_instead_of_reported_as_failed(probe_table):
+    def slow_insert(cursor):
+        time.sleep(0.5)
+        cursor.execute("INSERT INTO writer_probe (name) VALUES ('slow')")
+        return "done"
+
+    assert backend.db_writer.execute(slow_insert, timeout=0.1) == "done"
+    assert probe_count("slow") == 1
+
+
+def test_failed_write_does_not_roll_back_batch_neighbours(probe_table):
+    def broken(cursor):
+        cursor.execute("INSERT INTO writer_probe (name) VALUES ('broken')")
+        raise ValueError("boom")
+
+    release = threading.Event()
+    hold_writer(release)
+    futures = [backend.db_writer.submit(job) for job in (insert_probe("first"), broken, insert_probe("second"))]
+    release.set()
+
+    assert futures[0].result(5) is not None
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) is not None
+    assert (probe_count("first"), probe_count("broken"), probe_count("second")) == (1, 0, 1)
@@ -0,0 +1,32 @@
+import gzip
+import json
+import os
+import time
+
+import backend
+import utils
+
+USER = "export-owner"
+
+
+def test_export_is_written_to_a_served_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "current_user_id", lambda: USER)
+    monkeypatch.setattr(backend, "current_user_id", lambda: USER)
+    assert backend.storage.save_diary(USER, {
+        'date': '2024-06-01', 'time': '10:00', 'mood': '좋음', 'summary': '내보낼 일기',
+        'keywords': ['#기쁨'], 'suggested_keywords': [], 'action_items': [], 'chat_messages': []
+    })
+    stale = tmp_path / "old.txt"
+    stale.write_text("old")
+    os.utime(stale, (time.time() - backend.EXPORT_FILE_TTL_SECONDS - 60,) * 2)
+
+    url = utils.create_export_file("bundle")
+
+    assert url.startswith(backend.EXPORT_URL_PATH + "/") and url.endswith(".jsonl.gz")
+    # 다 쓴 파일만 남고, 기한이 지난 파일과 쓰는 중에 쓰던 임시 파일은 없습니다.
+    assert os.listdir(tmp_path) == [url.rsplit("/", 1)[1]]
+    with gzip.open(tmp_path / url.rsplit("/", 1)[1], 'rt', encoding='utf-8') as f:
+        summaries = [json.loads(line).get('summary') for line in f if line.strip()]
+    assert '내보낼 일기' in summaries
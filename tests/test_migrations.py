@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# 첫 버전 앱이 만들던 스키마 (마이그레이션이 생기기 전)
+BASELINE_SCHEMA = '''
+CREATE TABLE diary_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    mood TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    keywords TEXT,
+    suggested_keywords TEXT,
+    action_items TEXT,
+    chat_messages TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE deleted_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    original_id INTEGER,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    mood TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    keywords TEXT,
+    suggested_keywords TEXT,
+    action_items TEXT,
+    chat_messages TEXT,
+    deleted_date TEXT NOT NULL,
+    auto_delete_date TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE app_settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    setting_key TEXT UNIQUE NOT NULL,
+    setting_value TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE token_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    total_tokens INTEGER DEFAULT 0,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+# 새 프로세스에서 DB를 열면 마이그레이션이 돌고, 그 결과를 JSON 한 줄로 내보냅니다.
+INSPECT_SCRIPT = '''
+import json, backend
+backend.open_database()
+storage = backend.storage
+diaries = storage.load_diaries_in_range('', '2000-01-01', '2100-01-01')
+print("RESULT " + json.dumps({
+    "schema_version": backend.get_schema_version(),
+    "diaries": [[d['summary'], d['keywords'], d['action_items']] for d in diaries],
+    "messages": storage.load_chat_messages('', diaries[0]['id']) if diaries else [],
+    "search": [d['summary'] for d in storage.search_diaries('', '강아지')],
+    "trash": [[t['summary'], t['auto_delete_date']] for t in storage.load_deleted_entries('')],
+    "ai_name": storage.load_setting('', 'ai_name', None),
+    "token_usage": storage.load_token_usage(''),
+    "tables": sorted(row[0] for row in backend.get_db_connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'")),
+}, ensure_ascii=False))
+'''
+
+
+def create_baseline_db(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(BASELINE_SCHEMA)
+        messages = [{"role": "user", "content": "강아지랑 산책했어"}, {"role": "assistant", "content": "즐거웠겠어요!"}]
+        conn.execute('''
+        INSERT INTO diary_entries (date, time, mood, summary, keywords, suggested_keywords, action_items, chat_messages)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ('2024-03-01', '20:00', '좋음', '산책한 날', json.dumps(['#기쁨'], ensure_ascii=False),
+              json.dumps(['#기쁨', '#평온'], ensure_ascii=False), json.dumps(['내일도 걸어요'], ensure_ascii=False),
+              json.dumps(messages, ensure_ascii=False)))
+        conn.execute('''
+        INSERT INTO deleted_entries (original_id, date, time, mood, summary, keywords, suggested_keywords, action_items,
+                                     chat_messages, deleted_date, auto_delete_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (7, '2024-02-01', '08:00', '나쁨', '지운 일기', '[]', '[]', '[]', '[]',
+              '2099년 01월 01일 10시 30분', '2099년 01월 31일'))
+        # 자동삭제일을 읽을 수 없는 항목은 지운 날부터 30일 뒤로 채워집니다.
+        conn.execute('''
+        INSERT INTO deleted_entries (original_id, date, time, mood, summary, keywords, suggested_keywords, action_items,
+                                     chat_messages, deleted_date, auto_delete_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (8, '2024-02-02', '08:00', '보통', '날짜 없는 일기', '[]', '[]', '[]', '[]',
+              '2099년 01월 05일 09시 00분', '곧'))
+        conn.execute("INSERT INTO app_settings (setting_key, setting_value) VALUES ('ai_name', '별이')")
+        conn.execute("INSERT INTO token_usage (id, total_tokens) VALUES (1, 1234)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def start_app(cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("MINDTALK_DATABASE_URL", None)
+    completed = subprocess.run([sys.executable, "-c", INSPECT_SCRIPT], cwd=cwd, env=env,
+                               capture_output=True, text=True, timeout=120)
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("RESULT ")]
+    assert lines, completed.stdout + completed.stderr
+    return json.loads(lines[-1][len("RESULT "):])
+
+
+def test_baseline_database_is_migrated_without_losing_data(tmp_path):
+    create_baseline_db(tmp_path / "mindtalk_diary.db")
+
+    result = start_app(tmp_path)
+
+    import backend
+    assert result["schema_version"] == backend.MIGRATIONS[-1][0]
+    assert result["diaries"] == [["산책한 날", ["#기쁨"], ["내일도 걸어요"]]]
+    assert result["messages"] == [
+        {"role": "user", "content": "강아지랑 산책했어"},
+        {"role": "assistant", "content": "즐거웠겠어요!"}
+    ]
+    assert result["search"] == ["산책한 날"]
+    assert sorted(result["trash"]) == [["날짜 없는 일기", "2099년 02월 04일"], ["지운 일기", "2099년 01월 31일"]]
+    assert result["ai_name"] == "별이"
+    assert result["token_usage"] == 1234
+    assert "data_version" not in result["tables"] and "user_data_version" not in result["tables"]
+
+    # 이미 마이그레이션된 DB로 다시 시작해도 그대로입니다.
+    assert start_app(tmp_path) == result
+
+
+def test_fresh_database_is_created_at_the_latest_version(tmp_path):
+    result = start_app(tmp_path)
+
+    import backend
+    assert result["schema_version"] == backend.MIGRATIONS[-1][0]
+    assert {"diary_entries", "diary_archive", "diary_events", "chat_drafts"} <= set(result["tables"])
+    assert "data_version" not in result["tables"] and "user_data_version" not in result["tables"]
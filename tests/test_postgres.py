@@ -0,0 +1,167 @@
+import os
+import uuid
+
+import pytest
+
+import backend
+
+# PG_DSN에 테스트용 PostgreSQL 주소를 넣었을 때만 돕니다. (예: postgresql://postgres@localhost/mindtalk_test)
+PG_DSN = os.environ.get("PG_DSN")
+pytestmark = pytest.mark.skipif(not PG_DSN, reason="PG_DSN이 없어서 PostgreSQL 테스트를 건너뜁니다")
+
+
+@pytest.fixture(scope="module")
+def storage():
+    pytest.importorskip("psycopg2")
+    storage = backend.PostgresStorage(PG_DSN)
+    assert storage.init()
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def user_id():
+    return f"pg-{uuid.uuid4().hex}"
+
+
+def make_entry(date, summary, messages=None):
+    return {
+        'date': date, 'time': '21:00', 'mood': '좋음', 'summary': summary,
+        'keywords': ['#기쁨'], 'suggested_keywords': ['#기쁨', '#평온'], 'action_items': ['일찍 자요'],
+        'chat_messages': messages or []
+    }
+
+
+def test_diary_is_saved_listed_and_searched(storage, user_id):
+    marker = storage.load_change_marker()
+    messages = [{'role': 'user', 'content': '강아지랑 100% 신나게 뛰었어'}, {'role': 'assistant', 'content': '좋았겠어요!'}]
+    first = make_entry('2024-03-01', '공원 산책', messages)
+    second = make_entry('2024-03-02', '비 오는 날')
+    assert storage.save_diary(user_id, first) and storage.save_diary(user_id, second)
+
+    assert [diary['summary'] for diary in storage.load_diaries(user_id)] == ['공원 산책', '비 오는 날']
+    assert storage.load_chat_messages(user_id, first['id']) == messages
+    assert storage.load_chat_messages_by_ids(user_id, [first['id'], second['id']]) == {first['id']: messages}
+    assert storage.load_diary_dates(user_id) == ['2024-03-02', '2024-03-01']
+
+    page, next_cursor = storage.fetch_diaries(user_id, limit=1)
+    assert [diary['id'] for diary in page] == [second['id']]
+    page, next_cursor = storage.fetch_diaries(user_id, before=next_cursor, limit=1)
+    assert [diary['id'] for diary in page] == [first['id']] and next_cursor is None
+
+    found = storage.search_diaries(user_id, '100%')
+    assert [diary['id'] for diary in found] == [first['id']]
+    assert found[0]['snippet'] == '강아지랑 **100%** 신나게 뛰었어'
+    assert found[0]['suggested_keywords'] == ['#기쁨', '#평온']
+
+    events = storage.load_events(user_id, 0)
+    assert [(event['event'], event['diary_id']) for event in events] == [("create", first['id']), ("create", second['id'])]
+    assert storage.load_change_marker() > marker
+
+
+def test_trash_round_trip(storage, user_id):
+    entry = make_entry('2024-04-01', '지울 일기', [{'role': 'user', 'content': '지우고 싶어'}])
+    assert storage.save_diary(user_id, entry)
+
+    trashed = storage.delete_diaries(user_id, [entry['id']])
+    assert [item['original_id'] for item in trashed] == [entry['id']]
+    assert storage.load_diaries(user_id) == []
+    entries, _ = storage.fetch_deleted_entries(user_id)
+    assert [item['id'] for item in entries] == [trashed[0]['id']]
+
+    restored = storage.restore_many_from_trash(user_id, [trashed[0]['id']])
+    assert [diary['id'] for diary in restored] == [entry['id']]
+    assert storage.load_chat_messages(user_id, entry['id']) == [{'role': 'user', 'content': '지우고 싶어'}]
+
+    trashed = storage.delete_diaries(user_id, [entry['id']])
+    assert storage.permanent_delete_many_from_trash(user_id, [trashed[0]['id']]) == [trashed[0]['id']]
+    assert storage.load_deleted_entries(user_id) == []
+    assert storage.load_chat_messages(user_id, entry['id']) == []
+    assert [event['event'] for event in storage.load_events(user_id, 0)] == ["create", "trash", "restore", "trash", "purge"]
+
+
+def test_trash_without_original_id_is_restored_with_a_new_id(storage, user_id):
+    entry = make_entry('2024-04-02', '예전 휴지통 일기')
+    assert storage.save_diary(user_id, entry)
+    trash_id = storage.delete_diaries(user_id, [entry['id']])[0]['id']
+    storage._write(lambda cursor: cursor.execute('UPDATE deleted_entries SET original_id = NULL WHERE id = ?', (trash_id,)))
+
+    restored = storage.restore_many_from_trash(user_id, [trash_id])
+
+    assert [diary['summary'] for diary in restored] == ['예전 휴지통 일기']
+    assert restored[0]['id'] != entry['id']
+    assert storage.load_deleted_entries(user_id) == []
+    assert storage.load_events(user_id, 0)[-1]['diary_id'] == restored[0]['id']
+
+
+def test_empty_and_expired_trash(storage, user_id):
+    ids = []
+    for summary in ('하나', '둘'):
+        entry = make_entry('2024-04-03', summary)
+        assert storage.save_diary(user_id, entry)
+        ids.append(storage.delete_diaries(user_id, [entry['id']])[0]['id'])
+    storage._write(lambda cursor: cursor.execute("UPDATE deleted_entries SET auto_delete_at = '2000-01-01' WHERE id = ?", (ids[0],)))
+
+    assert ids[0] in storage.clean_expired_trash()
+    assert [item['id'] for item in storage.load_deleted_entries(user_id)] == [ids[1]]
+    assert storage.empty_trash(user_id) == 1
+    assert storage.load_deleted_entries(user_id) == []
+
+
+def test_old_diaries_are_archived_and_still_readable(storage, user_id):
+    messages = [{'role': 'user', 'content': '아주 오래전 이야기'}]
+    entry = make_entry('1990-01-01', '오래된 일기', messages)
+    assert storage.save_diary(user_id, entry)
+
+    assert storage.archive_diaries('1990-01-02') >= 1
+
+    assert storage.load_diaries(user_id) == []
+    assert [diary['id'] for diary in storage.load_diaries_in_range(user_id, '1989-01-01', '1991-01-01')] == [entry['id']]
+    assert storage.load_chat_messages(user_id, entry['id']) == messages
+    assert storage.search_diaries(user_id, '오래전')[0]['snippet'] == '아주 **오래전** 이야기'
+    summary = storage.load_archive_summary(user_id)
+    assert (summary['count'], summary['first_date'], summary['keyword_counts']) == (1, '1990-01-01', {'#기쁨': 1})
+
+    assert len(storage.delete_diaries(user_id, [entry['id']])) == 1
+    assert storage.load_archive_summary(user_id)['count'] == 0
+
+
+def test_drafts_settings_and_passwords(storage, user_id):
+    draft_id = storage.start_draft(user_id, '보통', [{'role': 'user', 'content': '안녕'}])
+    assert storage.append_draft_messages(user_id, draft_id, 1, [{'role': 'assistant', 'content': '반가워요'}])
+    assert [msg['content'] for msg in storage.load_draft(user_id)['messages']] == ['안녕', '반가워요']
+    entry = make_entry('2024-05-01', '임시 대화로 쓴 일기', storage.load_draft(user_id)['messages'])
+    entry['draft_id'] = draft_id
+    assert storage.save_diary(user_id, entry)
+    assert storage.load_draft(user_id) is None
+    assert [msg['content'] for msg in storage.load_chat_messages(user_id, entry['id'])] == ['안녕', '반가워요']
+
+    assert storage.save_settings(user_id, {'ai_name': '별이'}, token_usage=10)
+    assert storage.save_settings(user_id, {'ai_name': '달이'}, token_usage=25)
+    assert storage.load_setting(user_id, 'ai_name', None) == '달이'
+    assert storage.load_token_usage(user_id) == 25
+    assert storage.load_settings_snapshot(user_id) == {'ai_name': '달이', 'token_usage': '25'}
+
+    assert storage.load_password_hash(user_id) is None
+    assert storage.save_password_hash(user_id, 'first')
+    assert not storage.save_password_hash(user_id, 'second')
+    assert storage.save_password_hash(user_id, 'third', replace=True)
+    assert storage.load_password_hash(user_id) == 'third'
+
+
+def test_import_skips_existing_diaries(storage, user_id, tmp_path):
+    assert storage.save_diary(user_id, make_entry('2024-06-01', '이미 있는 일기'))
+    path = tmp_path / "diaries.jsonl"
+    path.write_text("\n".join([
+        '{"date": "2024-06-01", "time": "21:00", "mood": "좋음", "summary": "이미 있는 일기"}',
+        '{"date": "2024-06-02", "time": "09:00", "mood": "보통", "summary": "새 일기", "chat_messages": [{"role": "user", "content": "가져왔어"}]}',
+        'not json'
+    ]), encoding="utf-8")
+
+    def open_entries():
+        return backend.iter_import_entries(str(path), "jsonl", user_id)
+
+    assert storage.import_diaries(user_id, open_entries) == {'imported': 1, 'duplicates': 1, 'skipped': 1}
+    assert storage.import_diaries(user_id, open_entries) == {'imported': 0, 'duplicates': 2, 'skipped': 1}
+    imported = storage.search_diaries(user_id, '새 일기')
+    assert storage.load_chat_messages(user_id, imported[0]['id']) == [{'role': 'user', 'content': '가져왔어'}]
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+import backend
+import utils
+
+USER = "streak-owner"
+
+
+def day(offset):
+    return (datetime.now() - timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def test_streak_counts_archived_days(monkeypatch):
+    monkeypatch.setattr(backend, "current_user_id", lambda: USER)
+    for offset in (0, 1, 2, 4):
+        assert backend.storage.save_diary(USER, {
+            'date': day(offset), 'time': '22:00', 'mood': '보통', 'summary': f'{offset}일 전 일기',
+            'keywords': [], 'suggested_keywords': [], 'action_items': [], 'chat_messages': []
+        })
+    # 이틀 전 일기가 보관소로 가도 연속 작성일은 그대로입니다.
+    assert backend.storage.archive_diaries(day(1)) >= 2
+
+    assert utils.calculate_consecutive_days() == 3
@@ -0,0 +1,42 @@
+import backend
+
+USERS = ["trash-a", "trash-b"]
+
+
+def save_and_trash(user_id, summary):
+    entry = {
+        'date': '2024-04-01', 'time': '21:00', 'mood': '나쁨', 'summary': summary,
+        'keywords': [], 'suggested_keywords': [], 'action_items': [], 'chat_messages': []
+    }
+    assert backend.storage.save_diary(user_id, entry)
+    assert backend.storage.delete_diaries(user_id, [entry['id']])
+
+
+def test_expired_trash_is_purged_with_one_event_per_owner():
+    for user_id in USERS:
+        save_and_trash(user_id, f"{user_id} 일기")
+    backend.db_writer.execute(lambda cursor: cursor.execute(
+        "UPDATE deleted_entries SET auto_delete_at = '2000-01-01' WHERE user_id IN (?, ?)", USERS))
+    after_seq = backend.storage.load_event_range()[1]
+
+    purged = backend.storage.clean_expired_trash()
+
+    assert len(purged) >= 2
+    for user_id in USERS:
+        assert backend.storage.load_deleted_entries(user_id) == []
+        events = backend.storage.load_events(user_id, after_seq)
+        assert [event['event'] for event in events] == ["purge"]
+        assert events[0]['trash_id'] in purged
+
+
+def test_trash_without_original_id_is_restored_with_a_new_id():
+    save_and_trash("trash-legacy", "예전 휴지통 일기")
+    trash_id = backend.storage.load_deleted_entries("trash-legacy")[0]['id']
+    backend.db_writer.execute(lambda cursor: cursor.execute(
+        "UPDATE deleted_entries SET original_id = NULL WHERE id = ?", (trash_id,)))
+
+    restored = backend.storage.restore_many_from_trash("trash-legacy", [trash_id])
+
+    assert [diary['summary'] for diary in restored] == ["예전 휴지통 일기"]
+    assert backend.storage.load_deleted_entries("trash-legacy") == []
+    assert backend.storage.load_events("trash-legacy", 0)[-1]['diary_id'] == restored[0]['id']
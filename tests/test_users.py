@@ -0,0 +1,30 @@
+import backend
+import utils
+
+
+def test_named_diary_needs_its_own_password():
+    assert not utils.authenticate_user("Diary Owner", "secret-1")
+
+    assert utils.register_user("Diary Owner", "secret-1")
+    # 이름은 login_user와 같은 규칙으로 정리되므로 대소문자/공백이 달라도 같은 일기장입니다.
+    assert not utils.register_user("diary   owner", "other-password")
+
+    assert utils.authenticate_user("diary owner", "secret-1")
+    assert not utils.authenticate_user("diary owner", "other-password")
+    assert not utils.authenticate_user("diary owner", backend.APP_PASSWORD)
+    stored = backend.load_password_hash_from_db("diary owner")
+    assert stored.startswith("pbkdf2_sha256$") and "secret-1" not in stored
+
+
+def test_shared_diary_keeps_the_app_password():
+    assert utils.authenticate_user("", backend.APP_PASSWORD)
+    assert not utils.authenticate_user("", "wrong")
+    assert not utils.register_user("", "secret-1")
+
+
+def test_admin_can_replace_a_forgotten_password():
+    assert utils.register_user("forgetful", "first-pass")
+    assert backend.save_password_hash_to_db("forgetful", backend.hash_password("second-pass"), replace=True)
+
+    assert utils.authenticate_user("forgetful", "second-pass")
+    assert not utils.authenticate_user("forgetful", "first-pass")
@@ -2,6 +2,8 @@ import streamlit as st
 from datetime import datetime, timedelta
 import time
 import calendar as cal
+import html
+from urllib.parse import quote
 from backend import *
 from utils import *
 
@@ -77,14 +79,37 @@ def show_login():
         
         st.markdown("<br>", unsafe_allow_html=True)
         
-        password = st.text_input("비밀번호", type="password", placeholder="비밀번호를 입력하세요")
+        user_name = st.text_input("일기장 이름", placeholder="비워 두면 공용 일기장을 써요", max_chars=USER_ID_MAX_LENGTH)
+        password = st.text_input("비밀번호", type="password", placeholder="일기장 비밀번호를 입력하세요")
         
         if st.button("💜 마음톡 시작하기", use_container_width=True, key="login_button"):
-            if password.strip() == APP_PASSWORD:
-                st.session_state.authenticated = True
+            if authenticate_user(user_name, password):
+                login_user(user_name)
                 st.rerun()
             else:
-                st.error("비밀번호가 맞지 않아요")
+                st.error("일기장 이름이나 비밀번호가 맞지 않아요")
+        
+        # 새 일기장은 앱 비밀번호를 아는 사람만 만들 수 있고, 그 뒤로는 일기장 비밀번호로만 들어갑니다.
+        with st.expander("새 일기장 만들기"):
+            new_name = st.text_input("새 일기장 이름", max_chars=USER_ID_MAX_LENGTH, key="register_name")
+            new_password = st.text_input(
+                "일기장 비밀번호", type="password", key="register_password",
+                placeholder=f"{DIARY_PASSWORD_MIN_LENGTH}자 이상"
+            )
+            app_password = st.text_input("앱 비밀번호", type="password", key="register_app_password")
+            
+            if st.button("일기장 만들고 시작하기", use_container_width=True, key="register_button"):
+                if not normalize_user_id(new_name):
+                    st.error("일기장 이름을 입력해 주세요")
+                elif len(new_password) < DIARY_PASSWORD_MIN_LENGTH:
+                    st.error(f"일기장 비밀번호는 {DIARY_PASSWORD_MIN_LENGTH}자 이상이어야 해요")
+                elif app_password.strip() != APP_PASSWORD:
+                    st.error("앱 비밀번호가 맞지 않아요")
+                elif register_user(new_name, new_password):
+                    login_user(new_name)
+                    st.rerun()
+                else:
+                    st.error("이미 있는 일기장 이름이에요")
 
 def show_mood_selection():
     ai_name = st.session_state.ai_name
@@ -151,11 +176,13 @@ def show_mood_selection():
     </svg>
     """
 
+    # 링크를 누르면 새 세션으로 다시 열리므로, 누구의 일기장인지 user 파라미터와 그 서명(sig)을 함께 넘깁니다.
+    user_param = f"user={quote(current_user_id())}&sig={quote(sign_mood_link(current_user_id()))}"
     st.markdown(f"""
     <div class="mood-container">
-        <a href="?mood=good" target="_self" class="mood-button">{good_svg}</a>
-        <a href="?mood=normal" target="_self" class="mood-button">{normal_svg}</a>
-        <a href="?mood=bad" target="_self" class="mood-button">{bad_svg}</a>
+        <a href="?mood=good&{user_param}" target="_self" class="mood-button">{good_svg}</a>
+        <a href="?mood=normal&{user_param}" target="_self" class="mood-button">{normal_svg}</a>
+        <a href="?mood=bad&{user_param}" target="_self" class="mood-button">{bad_svg}</a>
     </div>
     """, unsafe_allow_html=True)
     
@@ -198,17 +225,18 @@ def show_mood_selection():
             st.session_state.current_step = "settings"
             st.rerun()
     
-    if st.session_state.diary_entries:
+    if total_diary_count() > 0:
         st.markdown("---")
         st.markdown("### 최근에 쓴 일기들")
         
         search_keyword = st.text_input("일기 검색", placeholder="찾고 싶은 키워드를 써봐요", key="home_search_diary")
         
-        entries_to_show = st.session_state.diary_entries[-7:][::-1]
+        home_pager = get_pager("home_diary_pager", fetch_diaries, DIARY_PAGE_SIZE)
+        entries_to_show = home_pager["entries"]
         
         if search_keyword:
             search_results = search_diaries(search_keyword)
-            entries_to_show = search_results[::-1] if search_results else []
+            entries_to_show = search_results
             if search_results:
                 st.success(f"'{search_keyword}' 검색 결과: {len(search_results)}개 발견!")
             else:
@@ -223,7 +251,7 @@ def show_mood_selection():
                 expander_title = f"{mood_emoji} {entry['date']} {entry.get('time', '')} - {entry['mood']}"
             
             with col2:
-                delete_key = f"home_delete_{entry['date']}_{entry.get('time', '')}_{i}_{hash(entry['summary'])}"
+                delete_key = f"home_delete_{entry['id']}"
                 if st.button("🗑️", key=delete_key, help="임시 보관함으로 이동"):
                     if move_to_trash(entry):
                         st.success("일기가 임시 보관함으로 이동했어요!")
@@ -233,8 +261,11 @@ def show_mood_selection():
                     else:
                         st.error("일기 삭제 중에 문제가 생겼어요.")
             
-            with st.expander(expander_title):
-                st.markdown(f"**그날 있었던 일:** {entry.get('summary', '내용 없음')}")
+            with st.expander(expander_title, expanded=bool(search_keyword)):
+                st.markdown(f"**그날 있었던 일:** {entry.get('highlight') or entry.get('summary', '내용 없음')}")
+                
+                if entry.get('snippet'):
+                    st.markdown(f"**대화 중에:** \"{entry['snippet']}\"")
                 
                 if entry.get('keywords'):
                     st.markdown(f"**감정:** {', '.join(entry['keywords'])}")
@@ -247,9 +278,28 @@ def show_mood_selection():
                     st.markdown("**AI 친구의 조언:**")
                     for item in entry['action_items']:
                         st.markdown(f"• {item}")
+                
+                # 대화 내용은 펼쳐볼 때만 DB에서 불러옵니다.
+                if st.checkbox("그날 나눈 대화 보기", key=f"show_chat_{entry['id']}"):
+                    chat_messages = load_chat_messages_from_db(entry['id'])
+                    if not chat_messages:
+                        st.caption("저장된 대화 내용이 없어요.")
+                    for msg in chat_messages:
+                        speaker = "나" if msg['role'] == "user" else st.session_state.ai_name
+                        st.markdown(f"**{speaker}:** {msg['content']}")
         
-        if len(st.session_state.diary_entries) > 7 and not search_keyword:
-            st.info(f"총 {len(st.session_state.diary_entries)}개의 일기가 있어요! 검색으로 더 찾아보세요.")
+        if home_pager["cursor"] is not None and not search_keyword:
+            st.info(f"총 {total_diary_count()}개의 일기가 있어요! 더 보거나 검색으로 찾아보세요.")
+            if st.button("더 보기", key="home_load_more", use_container_width=True):
+                load_next_page("home_diary_pager", fetch_diaries, DIARY_PAGE_SIZE)
+                st.rerun()
+
+# 대화 내용은 사용자가 쓴 글이므로 HTML로 해석되지 않게 이스케이프해서 말풍선에 넣습니다.
+def chat_bubble_html(role, content):
+    text = html.escape(str(content)).replace("\n", "<br>")
+    if role == "user":
+        return f'<div class="user-message">{text}</div>'
+    return f'<div class="ai-message"><b>{html.escape(st.session_state.ai_name)}</b>: {text}</div>'
 
 def show_chat():
     current_mood = st.session_state.get('current_mood', '선택하지 않음')
@@ -283,6 +333,9 @@ def show_chat():
         return
     
     display_token_bar()
+    
+    if st.session_state.pop('draft_resumed', False):
+        st.info("저장하지 못한 대화가 있어서 이어서 보여드려요. 계속 이야기하거나 일기로 저장해보세요.")
 
     chat_container = st.container()
     with chat_container:
@@ -302,18 +355,7 @@ def show_chat():
             """, unsafe_allow_html=True)
         else:
             for msg in st.session_state.chat_messages:
-                if msg["role"] == "user":
-                    st.markdown(f"""
-                    <div class="user-message">
-                        {msg['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="ai-message">
-                        <b>{st.session_state.ai_name}</b>: {msg['content']}
-                    </div>
-                    """, unsafe_allow_html=True)
+                st.markdown(chat_bubble_html(msg["role"], msg["content"]), unsafe_allow_html=True)
 
     st.markdown("---")
     
@@ -342,31 +384,35 @@ def show_chat():
             if st.form_submit_button("처음으로", use_container_width=True):
                 st.session_state.current_step = "mood_selection"
                 st.session_state.chat_messages = []
+                discard_chat_draft()
                 st.rerun()
         
         if send_button and user_input.strip():
             history_for_ai = st.session_state.chat_messages.copy()
             st.session_state.chat_messages.append({"role": "user", "content": user_input.strip()})
 
-            with st.spinner(f"{st.session_state.ai_name}가 답장을 쓰고 있어요..."):
-                moderation_result = check_content_with_moderation(user_input.strip())
-                danger_context = ""
-                if moderation_result.get("self_harm", False):
-                    danger_context = "\n\n중요: 사용자가 자해나 자살 관련 내용을 언급했습니다. 공감적으로 반응한 후 자연스럽게 전문 상담 연락처를 안내해주세요."
-                elif moderation_result.get("violence", False):
-                    danger_context = "\n\n중요: 사용자가 폭력이나 위험 상황을 언급했습니다. 안전을 우선시하며 적절한 도움 연락처를 안내해주세요."
-                
-                ai_result = get_ai_response(
-                    user_input.strip() + danger_context,
+            # 답장은 위쪽 대화 영역의 말풍선에 받는 대로 한 조각씩 이어서 보여줍니다.
+            with chat_container:
+                st.markdown(chat_bubble_html("user", user_input.strip()), unsafe_allow_html=True)
+                reply_bubble = st.empty()
+
+                ai_result = {}
+                reply = ""
+                for delta in stream_moderated_ai_response(
+                    user_input.strip(),
                     history_for_ai,
-                    st.session_state.conversation_context
-                )
+                    st.session_state.conversation_context,
+                    result=ai_result
+                ):
+                    reply += delta
+                    reply_bubble.markdown(chat_bubble_html("assistant", reply), unsafe_allow_html=True)
             
             if ai_result["success"]:
                 st.session_state.chat_messages.append({
                     "role": "assistant",
                     "content": ai_result["response"]
                 })
+                save_chat_turn(st.session_state.chat_messages[-2:])
             else:
                 st.session_state.chat_messages.pop()
                 st.error(f"❌ {ai_result['response']}")
@@ -381,10 +427,12 @@ def show_summary():
             st.rerun()
         return
     
-    if 'temp_summary' not in st.session_state:
-        with st.spinner("AI가 오늘 있었던 일을 정리하고 있어요..."):
-            summary_result = generate_conversation_summary(st.session_state.chat_messages)
-            st.session_state.temp_summary = summary_result
+    if 'temp_summary' not in st.session_state or 'suggested_emotions' not in st.session_state:
+        with st.spinner("AI가 오늘 있었던 일과 감정을 정리하고 있어요..."):
+            current_mood = st.session_state.get('current_mood', '보통')
+            analysis = analyze_conversation(st.session_state.chat_messages, current_mood)
+            st.session_state.temp_summary = analysis
+            st.session_state.suggested_emotions = analysis['suggested_keywords']
     
     summary_data = st.session_state.temp_summary
     
@@ -395,12 +443,6 @@ def show_summary():
     </div>
     """, unsafe_allow_html=True)
     
-    if 'suggested_emotions' not in st.session_state:
-        with st.spinner("어떤 감정이 느껴지는지 분석하고 있어요..."):
-            current_mood = st.session_state.get('current_mood', '보통')
-            suggested_emotions = generate_emotion_keywords(st.session_state.chat_messages, current_mood)
-            st.session_state.suggested_emotions = suggested_emotions
-    
     st.markdown("### 감정 키워드")
     st.markdown("**AI가 대화 속에서 느껴졌던 감정들이랍니다. 마음에 드는 것들을 골라보세요.**")
     
@@ -461,11 +503,11 @@ def show_summary():
                 'keywords': selected_emotions,
                 'suggested_keywords': st.session_state.suggested_emotions,
                 'action_items': summary_data.get('action_items', []),
-                'chat_messages': st.session_state.chat_messages.copy()
+                'chat_messages': st.session_state.chat_messages.copy(),
+                'draft_id': st.session_state.get('draft_id')
             }
             
-            if save_diary_to_db(diary_entry):
-                st.session_state.diary_entries.append(diary_entry)
+            if save_diary(diary_entry):
                 
                 st.session_state.conversation_context.append({
                     'summary': summary_data['summary'],
@@ -492,6 +534,7 @@ def show_summary():
         if st.button("처음으로", use_container_width=True, key="home_from_summary"):
             st.session_state.current_step = "mood_selection"
             st.session_state.chat_messages = []
+            discard_chat_draft()
             for key in ['temp_summary', 'suggested_emotions']:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -505,9 +548,6 @@ def show_trash():
     </div>
     """, unsafe_allow_html=True)
     
-    clean_expired_trash()
-    st.session_state.deleted_entries = load_deleted_entries_from_db()
-    
     deleted_entries = st.session_state.deleted_entries
     
     st.markdown(f"### 현재 {len(deleted_entries)}개의 일기가 임시 보관중이에요")
@@ -525,26 +565,24 @@ def show_trash():
     
     if st.button("휴지통 전체 비우기", type="secondary", key="empty_all_trash"):
         if st.checkbox("정말로 휴지통을 완전히 비울거예요? (다시 돌릴 수 없어요)", key="confirm_empty_all_trash"):
-            try:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM deleted_entries')
-                conn.commit()
-                conn.close()
-                
-                st.session_state.deleted_entries = []
-                st.success("휴지통이 완전히 비워졌어요.")
-                st.rerun()
-            except Exception as e:
-                st.error(f"휴지통 비우기 중 오류: {e}")
+            empty_trash()
+            st.success("휴지통이 완전히 비워졌어요.")
+            st.rerun()
     
     st.markdown("---")
     
-    for i, entry in enumerate(deleted_entries):
+    trash_pager = get_pager("trash_pager", fetch_deleted_entries, TRASH_PAGE_SIZE)
+    
+    selected_entries = []
+    
+    for i, entry in enumerate(trash_pager["entries"]):
         mood_emoji = {"좋음": "😊", "보통": "😐", "나쁨": "😔"}.get(entry['mood'], "")
         deleted_date = entry.get('deleted_date', '알 수 없음')
         auto_delete_date = entry.get('auto_delete_date', '알 수 없음')
         
+        if st.checkbox("선택", key=f"select_trash_{entry['id']}"):
+            selected_entries.append(entry)
+        
         with st.expander(f"🗑️ {mood_emoji} {entry['date']} - {entry['mood']} (삭제일: {deleted_date})"):
             st.markdown(f"**그날 있었던 일:** {entry.get('summary', '내용 없음')}")
             if entry.get('keywords'):
@@ -553,7 +591,7 @@ def show_trash():
             
             col1, col2 = st.columns(2)
             with col1:
-                restore_key = f"restore_trash_{i}_{entry['date']}_{entry.get('time', '')}_{hash(entry['summary'])}"
+                restore_key = f"restore_trash_{entry['id']}"
                 if st.button("다시 가져오기", key=restore_key, use_container_width=True):
                     if restore_from_trash(entry):
                         st.success("일기가 다시 돌아왔어!")
@@ -562,9 +600,9 @@ def show_trash():
                     else:
                         st.error("복원 중에 문제가 생겼어요.")
             with col2:
-                permanent_delete_key = f"permanent_trash_{i}_{entry['date']}_{entry.get('time', '')}_{hash(entry['summary'])}"
+                permanent_delete_key = f"permanent_trash_{entry['id']}"
                 if st.button("완전히 삭제", key=permanent_delete_key, use_container_width=True, type="secondary"):
-                    confirm_key = f"confirm_permanent_trash_{i}_{entry['date']}_{hash(entry['summary'])}"
+                    confirm_key = f"confirm_permanent_trash_{entry['id']}"
                     if st.checkbox("정말로 완전히 삭제할거예요? (다시 돌릴 수 없어요)", key=confirm_key):
                         if permanent_delete_from_trash(entry):
                             st.success("일기가 완전히 삭제되었어요.")
@@ -573,6 +611,35 @@ def show_trash():
                         else:
                             st.error("완전 삭제 중에 문제가 생겼어요.")
     
+    if trash_pager["cursor"] is not None:
+        if st.button("더 보기", key="trash_load_more", use_container_width=True):
+            load_next_page("trash_pager", fetch_deleted_entries, TRASH_PAGE_SIZE)
+            st.rerun()
+    
+    if selected_entries:
+        st.markdown(f"**{len(selected_entries)}개 선택됨**")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("선택한 일기 다시 가져오기", key="restore_selected_trash", use_container_width=True):
+                restored_count = restore_many_from_trash(selected_entries)
+                if restored_count:
+                    st.success(f"{restored_count}개의 일기가 다시 돌아왔어요!")
+                    time.sleep(1)
+                    st.rerun()
+                else:
+                    st.error("복원 중에 문제가 생겼어요.")
+        with col2:
+            confirm_selected = st.checkbox("선택한 일기를 완전히 삭제할게요 (다시 돌릴 수 없어요)", key="confirm_delete_selected_trash")
+            if st.button("선택한 일기 완전히 삭제", key="delete_selected_trash", use_container_width=True,
+                         type="secondary", disabled=not confirm_selected):
+                deleted_count = permanent_delete_many_from_trash(selected_entries)
+                if deleted_count:
+                    st.success(f"{deleted_count}개의 일기가 완전히 삭제되었어요.")
+                    time.sleep(1)
+                    st.rerun()
+                else:
+                    st.error("완전 삭제 중에 문제가 생겼어요.")
+    
     st.markdown("---")
     if st.button("홈으로", key="home_from_trash"):
         st.session_state.current_step = "mood_selection"
@@ -586,7 +653,7 @@ def show_calendar():
     </div>
     """, unsafe_allow_html=True)
     
-    if not st.session_state.diary_entries:
+    if total_diary_count() == 0:
         st.info("아직 쓴 일기가 없어요.")
         if st.button("일기 써보기", key="write_diary_from_calendar"):
             st.session_state.current_step = "mood_selection"
@@ -597,8 +664,12 @@ def show_calendar():
     selected_year = st.selectbox("연도", [today.year - 1, today.year, today.year + 1], index=1, key="calendar_year")
     selected_month = st.selectbox("월", list(range(1, 13)), index=today.month - 1, key="calendar_month")
     
+    # 보관된 일기도 보이도록 고른 달의 일기만 DB에서 불러옵니다.
+    month_start = f"{selected_year:04d}-{selected_month:02d}-01"
+    next_month_start = f"{selected_year + selected_month // 12:04d}-{selected_month % 12 + 1:02d}-01"
+    
     month_entries = {}
-    for entry in st.session_state.diary_entries:
+    for entry in load_diaries_in_range_from_db(month_start, next_month_start):
         try:
             entry_date = datetime.strptime(entry['date'], '%Y-%m-%d')
             if entry_date.year == selected_year and entry_date.month == selected_month:
@@ -745,14 +816,14 @@ def show_statistics():
     </div>
     """, unsafe_allow_html=True)
     
-    if not st.session_state.diary_entries:
+    if total_diary_count() == 0:
         st.info("아직 쓴 일기가 없어요. 첫 번째 일기를 써보아요!")
         if st.button("일기 써보기", key="write_diary_from_statistics"):
             st.session_state.current_step = "mood_selection"
             st.rerun()
         return
     
-    total_entries = len(st.session_state.diary_entries)
+    total_entries = total_diary_count()
     consecutive_days = calculate_consecutive_days()
     
     col1, col2, col3 = st.columns(3)
@@ -764,8 +835,12 @@ def show_statistics():
         st.metric("연속 작성일", f"{consecutive_days}일")
     
     with col3:
+        first_dates = [st.session_state.archive_summary['first_date']]
         if st.session_state.diary_entries:
-            first_date_str = st.session_state.diary_entries[0]['date']
+            first_dates.append(st.session_state.diary_entries[0]['date'])
+        first_dates = [date for date in first_dates if date]
+        if first_dates:
+            first_date_str = min(first_dates)
             first_date = datetime.strptime(first_date_str, '%Y-%m-%d').date()
             days_since_start = (datetime.now().date() - first_date).days + 1
             st.metric("일기 시작한 지", f"{days_since_start}일")
@@ -841,27 +916,34 @@ def show_settings():
     col1, col2 = st.columns(2)
     
     with col1:
+        export_format = st.selectbox(
+            "내보낼 형식",
+            available_export_formats(),
+            format_func=lambda key: EXPORT_FORMATS[key]['label'],
+            key="export_format"
+        )
+        include_transcripts = st.checkbox("나눈 대화도 함께 담기", key="export_include_transcripts")
+        if export_format == "parquet":
+            st.caption("Parquet에는 휴지통을 뺀 일기만 담기고, 대화는 내용 대신 메시지 수와 글자 수로 담겨요.")
         if st.button("일기 백업하기", key="backup_diary_data"):
-            export_data = export_diary_data()
-            st.download_button(
-                label="파일로 다운로드",
-                data=export_data,
-                file_name=f"마음톡_일기백업_{datetime.now().strftime('%Y%m%d')}.txt",
-                mime="text/plain",
-                key="download_backup"
-            )
+            with st.spinner("일기를 모으는 중이에요..."):
+                export_url = create_export_file(export_format, include_transcripts)
+            if export_url is None:
+                st.error("일기를 내보내는 중에 문제가 생겼어요.")
+            else:
+                file_name = f"마음톡_일기백업_{datetime.now().strftime('%Y%m%d')}.{EXPORT_FORMATS[export_format]['extension']}"
+                st.markdown(
+                    f'<a href="{html.escape(export_url)}" download="{html.escape(file_name)}">파일로 다운로드</a>',
+                    unsafe_allow_html=True
+                )
+                st.caption(f"다운로드 링크는 {EXPORT_FILE_TTL_SECONDS // 60}분 동안만 열려요.")
     
     with col2:
         if st.button("모든 일기 삭제", key="delete_all_diaries"):
-            if st.session_state.diary_entries:
+            if total_diary_count() > 0:
                 confirm_key = "confirm_delete_all_diaries"
                 if st.checkbox("정말로 모든 일기를 삭제할거예요? (임시 보관함으로 이동)", key=confirm_key):
-                    moved_count = 0
-                    entries_to_move = st.session_state.diary_entries.copy()
-                    
-                    for entry in entries_to_move:
-                        if move_to_trash(entry):
-                            moved_count += 1
+                    moved_count = move_all_to_trash()
                     
                     if moved_count > 0:
                         st.success(f"{moved_count}개의 일기가 임시 보관함으로 이동했어요.")
@@ -874,6 +956,19 @@ def show_settings():
             else:
                 st.info("삭제할 일기가 없어요.")
     
+    st.markdown("### 일기 가져오기")
+    st.caption("백업 파일(.db)이나 내보낸 일기 파일(.jsonl, .jsonl.gz)의 일기를 지금 일기장에 더해요. 이미 있는 일기는 건너뛰어요.")
+    uploaded_file = st.file_uploader("가져올 파일", type=["db", "jsonl", "gz"], key="import_diary_file")
+    if uploaded_file is not None and st.button("일기 가져오기", key="import_diaries"):
+        with st.spinner("일기를 가져오는 중이에요..."):
+            result = import_diary_file(uploaded_file)
+        if result is None:
+            st.error("일기를 가져오는 중에 문제가 생겼어요.")
+        else:
+            st.success(f"{result['imported']}개의 일기를 가져왔어요.")
+            if result['duplicates'] or result['skipped']:
+                st.info(f"이미 있는 일기 {result['duplicates']}개와 읽을 수 없는 항목 {result['skipped']}개는 건너뛰었어요.")
+    
     st.markdown("### 임시 보관함 관리")
     
     trash_count = len(st.session_state.deleted_entries)
@@ -892,25 +987,16 @@ def show_settings():
             if st.button("보관함 완전히 비우기", key="empty_trash_from_settings"):
                 confirm_key = "confirm_empty_trash_from_settings"
                 if st.checkbox("보관함의 모든 일기를 완전히 삭제할거예요? (다시 돌릴 수 없어요)", key=confirm_key):
-                    try:
-                        conn = sqlite3.connect(DB_PATH)
-                        cursor = conn.cursor()
-                        cursor.execute('DELETE FROM deleted_entries')
-                        conn.commit()
-                        conn.close()
-                        
-                        st.session_state.deleted_entries = []
-                        st.success("보관함이 완전히 비워졌어요.")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"보관함 비우기 중 오류: {e}")
+                    empty_trash()
+                    st.success("보관함이 완전히 비워졌어요.")
+                    st.rerun()
     else:
         st.info("임시 보관함이 비어있어요.")
     
-    if st.session_state.diary_entries or st.session_state.deleted_entries:
+    if total_diary_count() > 0 or st.session_state.deleted_entries:
         st.markdown("### 앱 사용 현황")
         
-        total_entries = len(st.session_state.diary_entries)
+        total_entries = total_diary_count()
         deleted_entries = len(st.session_state.deleted_entries)
         consecutive_days = calculate_consecutive_days()
         token_usage = st.session_state.get('token_usage', 0)
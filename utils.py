@@ -1,8 +1,24 @@
 import streamlit as st
 from datetime import datetime, timedelta
 import time
+import os
+import io
+import csv
+import gzip
+import json
+import tempfile
+import hmac
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 from backend import *
 
+# 분석용 Parquet 내보내기에만 필요합니다. (pip install pyarrow, 보통 streamlit과 함께 설치돼요)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
 def get_theme_style(theme_name):
     theme = THEMES.get(theme_name, THEMES["라벤더"])
     
@@ -189,7 +205,7 @@ def check_content_with_moderation(text: str) -> dict:
         }
     
     try:
-        response = client.moderations.create(input=text)
+        response = get_openai_client().moderations.create(input=text)
         result = response.results[0]
         
         is_self_harm = (result.categories.self_harm or 
@@ -217,6 +233,62 @@ def check_content_with_moderation(text: str) -> dict:
             "fallback": True
         }
 
+# 위험 내용이 감지됐을 때 답장 프롬프트에 덧붙이는 안내 문구
+def moderation_safety_instruction(moderation_result: dict) -> str:
+    if moderation_result.get("self_harm", False):
+        return "\n\n중요: 사용자가 자해나 자살 관련 내용을 언급했습니다. 공감적으로 반응한 후 자연스럽게 전문 상담 연락처를 안내해주세요."
+    elif moderation_result.get("violence", False):
+        return "\n\n중요: 사용자가 폭력이나 위험 상황을 언급했습니다. 안전을 우선시하며 적절한 도움 연락처를 안내해주세요."
+    return ""
+
+# 검사 요청은 스크립트 스레드를 막지 않도록 작은 스레드 풀에서 돌립니다.
+moderation_executor = ThreadPoolExecutor(max_workers=MODERATION_WORKERS, thread_name_prefix="moderation")
+
+# 위험 내용 검사와 답장 요청을 동시에 보냅니다.
+# 답장은 안내 문구 없이 먼저 요청해 두고, 첫 조각이 오면 검사 결과를 확인한 뒤에야 화면에 내보냅니다.
+# 자해/폭력이 감지되면 먼저 받던 답장은 닫아 버리고 안내 문구를 붙여 다시 요청합니다.
+# (대부분의 메시지는 검사에 걸리지 않으므로 한 번 왕복하는 시간만 기다리면 됩니다)
+def stream_moderated_ai_response(user_message: str, conversation_history: List[Dict], context: List[Dict] = None, result: Dict = None):
+    if result is None:
+        result = {}
+    text = user_message.strip() if isinstance(user_message, str) else ""
+    
+    # 어차피 보내지 않을 메시지(빈 메시지, 에너지 소진)는 검사도 하지 않습니다.
+    blocked = check_chat_request(text)
+    if blocked:
+        result.update(blocked)
+        return
+    
+    try:
+        moderation_future = moderation_executor.submit(check_content_with_moderation, text)
+    except Exception as e:
+        print(f"위험 내용 검사 요청 오류: {e}")
+        moderation_future = None
+    
+    speculative = stream_ai_response(text, conversation_history, context, result=result)
+    first_delta = next(speculative, None)
+    
+    try:
+        if moderation_future is None:
+            raise RuntimeError("검사 요청을 보내지 못했어요")
+        moderation_result = moderation_future.result(timeout=MODERATION_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"위험 내용 검사 대기 오류: {e}")
+        moderation_result = {
+            "self_harm": check_harmful_content(text),
+            "violence": check_violence_content(text)
+        }
+    
+    danger_context = moderation_safety_instruction(moderation_result)
+    if danger_context:
+        speculative.close()
+        yield from stream_ai_response(text + danger_context, conversation_history, context, result=result)
+        return
+    
+    if first_delta is not None:
+        yield first_delta
+        yield from speculative
+
 def display_token_bar():
     try:
         token_usage = max(0, int(st.session_state.get('token_usage', 0)))
@@ -254,39 +326,21 @@ def display_token_bar():
 
 def calculate_consecutive_days():
     try:
-        if not st.session_state.diary_entries:
-            return 0
-        
-        entry_dates = {datetime.strptime(entry['date'], '%Y-%m-%d').date() 
-                       for entry in st.session_state.diary_entries if 'date' in entry}
+        # 세션에는 최근 일기만 있으므로 보관소까지 포함한 날짜 목록을 DB에서 읽습니다.
+        entry_dates = {datetime.strptime(date, '%Y-%m-%d').date() for date in load_diary_dates_from_db()}
         
         if not entry_dates:
             return 0
         
-        sorted_dates = sorted(list(entry_dates), reverse=True)
-        
-        today = datetime.now().date()
+        # 오늘 아직 안 썼으면 어제부터 거꾸로 셉니다.
+        day = datetime.now().date()
+        if day not in entry_dates:
+            day -= timedelta(days=1)
         
-        if today not in sorted_dates:
-            start_date = today - timedelta(days=1)
-            consecutive = 0
-        else:
-            start_date = today
-            consecutive = 1
-        
-        if consecutive == 1:
-            for i in range(1, len(sorted_dates)):
-                if sorted_dates[i] == start_date - timedelta(days=i):
-                    consecutive += 1
-                else:
-                    break
-        else:
-            for i, date in enumerate(sorted_dates):
-                if date == start_date - timedelta(days=i):
-                    consecutive += 1
-                else:
-                    break
-                    
+        consecutive = 0
+        while day in entry_dates:
+            consecutive += 1
+            day -= timedelta(days=1)
         return consecutive
     except Exception as e:
         print(f"연속 작성일 계산 오류: {e}")
@@ -294,11 +348,13 @@ def calculate_consecutive_days():
 
 def generate_emotion_stats():
     try:
-        if not st.session_state.diary_entries:
+        if total_diary_count() == 0:
             return None
         
-        mood_counts = {}
-        keyword_counts = {}
+        # 보관된 일기는 DB에서 미리 세어 둔 요약에서 시작합니다.
+        archive_summary = st.session_state.get('archive_summary', empty_archive_summary())
+        mood_counts = dict(archive_summary['mood_counts'])
+        keyword_counts = dict(archive_summary['keyword_counts'])
         
         for entry in st.session_state.diary_entries:
             try:
@@ -334,9 +390,13 @@ def generate_emotion_stats():
 
 def search_diaries(keyword):
     try:
-        if not keyword or not st.session_state.diary_entries:
+        if not keyword or total_diary_count() == 0:
             return []
         
+        # 관련도순 결과 (FTS5 인덱스가 있으면 DB에서, 없으면 세션 메모리에서 최신순으로)
+        if search_index_available:
+            return search_diaries_db(keyword)
+        
         results = []
         keyword_lower = keyword.lower()
         
@@ -350,105 +410,504 @@ def search_diaries(keyword):
             except Exception:
                 continue
         
-        return results
+        return results[::-1]
     except Exception:
         return []
 
-def export_diary_data():
+# 일기 내보내기
+# 세션 목록 대신 DB에서 EXPORT_BATCH_SIZE개씩(최신순) 읽어서 그 페이지만 골라 둔 형식으로 바꿔 흘려 보냅니다.
+# 글(text)/JSONL/CSV/압축 묶음(bundle, gzip으로 압축한 JSONL) 가운데 고를 수 있고, 압축 묶음은 일기 가져오기에서 그대로 읽을 수 있어요.
+# 대화 내용은 include_transcripts일 때만 페이지마다 한 번에 읽어서 붙입니다.
+def iter_export_pages(include_transcripts=False, include_trash=True):
+    sources = [("diary", fetch_diaries, 'id')]
+    if include_trash:
+        sources.append(("trash", fetch_deleted_entries, 'original_id'))
+    for kind, fetch_page, id_key in sources:
+        before = None
+        while True:
+            entries, before = fetch_page(before, EXPORT_BATCH_SIZE)
+            if entries and include_transcripts:
+                messages = load_chat_messages_by_ids_from_db([entry[id_key] for entry in entries if entry[id_key] is not None])
+                for entry in entries:
+                    entry['chat_messages'] = messages.get(entry[id_key], [])
+            if entries:
+                yield kind, entries
+            if before is None:
+                break
+
+def format_text_entry(kind, entry, ai_name):
+    if kind == "diary":
+        lines = [f"📅 날짜: {entry.get('date', '날짜 없음')} {entry.get('time', '')}"]
+    else:
+        lines = [
+            f"📅 원본 날짜: {entry.get('date', '날짜 없음')} {entry.get('time', '')}",
+            f"🗑️ 보관함에 들어온 날: {entry.get('deleted_date', '알 수 없음')}",
+            f"⏰ 자동삭제 예정일: {entry.get('auto_delete_date', '알 수 없음')}"
+        ]
+    lines.append(f"😊 기분: {entry.get('mood', '기분 없음')}")
+    lines.append(f"📝 오늘 있었던 일: {entry.get('summary', '내용 없음')}")
+    
+    if entry.get('keywords'):
+        lines.append(f"🏷️ 감정 키워드: {', '.join(entry['keywords'])}")
+    
+    if kind == "diary" and entry.get('action_items'):
+        lines.append("💡 AI 친구의 조언:")
+        lines.extend(f"   • {item}" for item in entry['action_items'])
+    
+    if entry.get('chat_messages'):
+        lines.append("💬 나눈 대화:")
+        for msg in entry['chat_messages']:
+            speaker = "나" if msg.get('role') == "user" else ai_name
+            lines.append(f"   {speaker}: {msg.get('content', '')}")
+    
+    return "\n".join(lines) + "\n\n" + "-"*30 + "\n\n"
+
+EXPORT_CSV_COLUMNS = ['type', 'id', 'date', 'time', 'mood', 'summary', 'keywords', 'suggested_keywords', 'action_items', 'deleted_date', 'auto_delete_date']
+
+def format_csv_rows(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+# 페이지마다 문자열 조각 하나를 내줍니다.
+def iter_export_chunks(export_format, include_transcripts=False):
+    counts = {"diary": 0, "trash": 0}
+    ai_name = st.session_state.get('ai_name', DEFAULT_AI_NAME)
+    columns = EXPORT_CSV_COLUMNS + (['transcript'] if include_transcripts else [])
+    
+    if export_format == "text":
+        yield "=== 💜 마음톡 감정일기 백업 ===\n\n"
+    elif export_format == "csv":
+        # 엑셀에서 한글이 깨지지 않도록 BOM을 붙입니다.
+        yield "\ufeff" + format_csv_rows([columns])
+    
+    for kind, entries in iter_export_pages(include_transcripts):
+        if export_format == "text":
+            heading = ""
+            if counts[kind] == 0:
+                title = "📚 나의 일기들" if kind == "diary" else "\n🗑️ 임시 보관함"
+                heading = f"{title}\n" + "=" * 50 + "\n\n"
+            yield heading + "".join(format_text_entry(kind, entry, ai_name) for entry in entries)
+        elif export_format == "csv":
+            rows = []
+            for entry in entries:
+                row = [kind] + [entry.get(column, '') for column in EXPORT_CSV_COLUMNS[1:]]
+                row[6:9] = [", ".join(map(str, entry.get(column) or [])) for column in ('keywords', 'suggested_keywords', 'action_items')]
+                if include_transcripts:
+                    row.append("\n".join(f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in entry.get('chat_messages', [])))
+                rows.append(row)
+            yield format_csv_rows(rows)
+        else:
+            yield "".join(json.dumps({'type': kind, **entry}, ensure_ascii=False) + "\n" for entry in entries)
+        counts[kind] += len(entries)
+    
+    if export_format == "text":
+        if counts["diary"] == 0 and counts["trash"] == 0:
+            yield "내보낼 일기가 없어요.\n"
+        yield f"\n📊 총계: 일기 {counts['diary']}개, 임시보관 {counts['trash']}개\n"
+        yield f"백업 날짜: {datetime.now().strftime('%Y년 %m월 %d일 %H시 %M분')}"
+
+def available_export_formats():
+    return [key for key in EXPORT_FORMATS if key != "parquet" or pa is not None]
+
+# 분석용 Parquet: 휴지통을 뺀 일기만 열 단위로 담고, 날짜는 date 타입, 키워드/조언은 문자열 목록으로 둡니다.
+# 대화 내용 대신 대화 수/내가 보낸 메시지 수/글자 수만 담고, PARQUET_ROW_GROUP_SIZE개씩 row group으로 씁니다.
+def parquet_export_schema(include_transcripts=False):
+    fields = [
+        ('id', pa.int64()),
+        ('date', pa.date32()),
+        ('time', pa.string()),
+        ('mood', pa.string()),
+        ('summary', pa.string()),
+        ('keywords', pa.list_(pa.string())),
+        ('suggested_keywords', pa.list_(pa.string())),
+        ('action_items', pa.list_(pa.string()))
+    ]
+    if include_transcripts:
+        fields += [('message_count', pa.int32()), ('user_message_count', pa.int32()), ('transcript_chars', pa.int32())]
+    return pa.schema(fields)
+
+def parse_export_date(text):
     try:
-        active_count = len(st.session_state.diary_entries)
-        deleted_count = len(st.session_state.deleted_entries)
-        
-        if active_count == 0 and deleted_count == 0:
-            return "내보낼 일기가 없어요."
-        
-        export_text = "=== 💜 마음톡 감정일기 백업 ===\n\n"
-        
-        if active_count > 0:
-            export_text += f"📚 나의 일기들 ({active_count}개)\n"
-            export_text += "=" * 50 + "\n\n"
-            
-            for i, entry in enumerate(st.session_state.diary_entries):
-                try:
-                    export_text += f"📅 날짜: {entry.get('date', '날짜 없음')} {entry.get('time', '')}\n"
-                    export_text += f"😊 기분: {entry.get('mood', '기분 없음')}\n"
-                    export_text += f"📝 오늘 있었던 일: {entry.get('summary', '내용 없음')}\n"
-                    
-                    if entry.get('keywords'):
-                        export_text += f"🏷️ 감정 키워드: {', '.join(entry['keywords'])}\n"
-                    
-                    if entry.get('action_items'):
-                        export_text += f"💡 AI 친구의 조언:\n"
-                        for item in entry['action_items']:
-                            export_text += f"   • {item}\n"
-                    
-                    export_text += "\n" + "-"*30 + "\n\n"
-                except Exception:
-                    continue
-        
-        if deleted_count > 0:
-            export_text += f"\n🗑️ 임시 보관함 ({deleted_count}개)\n"
-            export_text += "=" * 50 + "\n\n"
-            
-            for i, entry in enumerate(st.session_state.deleted_entries):
-                try:
-                    export_text += f"📅 원본 날짜: {entry.get('date', '날짜 없음')} {entry.get('time', '')}\n"
-                    export_text += f"🗑️ 보관함에 들어온 날: {entry.get('deleted_date', '알 수 없음')}\n"
-                    export_text += f"⏰ 자동삭제 예정일: {entry.get('auto_delete_date', '알 수 없음')}\n"
-                    export_text += f"😊 기분: {entry.get('mood', '기분 없음')}\n"
-                    export_text += f"📝 오늘 있었던 일: {entry.get('summary', '내용 없음')}\n"
-                    
-                    if entry.get('keywords'):
-                        export_text += f"🏷️ 감정 키워드: {', '.join(entry['keywords'])}\n"
-                    
-                    export_text += "\n" + "-"*30 + "\n\n"
-                except Exception:
-                    continue
-        
-        export_text += f"\n📊 총계: 일기 {active_count}개, 임시보관 {deleted_count}개\n"
-        export_text += f"백업 날짜: {datetime.now().strftime('%Y년 %m월 %d일 %H시 %M분')}"
+        return datetime.strptime(text, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+def write_parquet_export(target, include_transcripts=False):
+    schema = parquet_export_schema(include_transcripts)
+    columns = {name: [] for name in schema.names}
+    
+    def flush(writer):
+        if columns['id']:
+            writer.write_table(pa.table(columns, schema=schema))
+            for values in columns.values():
+                values.clear()
+    
+    with pq.ParquetWriter(target, schema, compression='zstd') as writer:
+        for kind, entries in iter_export_pages(include_transcripts, include_trash=False):
+            for entry in entries:
+                columns['id'].append(entry['id'])
+                columns['date'].append(parse_export_date(entry.get('date')))
+                columns['time'].append(entry.get('time'))
+                columns['mood'].append(entry.get('mood'))
+                columns['summary'].append(entry.get('summary'))
+                for key in ('keywords', 'suggested_keywords', 'action_items'):
+                    columns[key].append([str(item) for item in entry.get(key) or []])
+                if include_transcripts:
+                    messages = entry.get('chat_messages', [])
+                    columns['message_count'].append(len(messages))
+                    columns['user_message_count'].append(sum(1 for msg in messages if msg.get('role') == "user"))
+                    columns['transcript_chars'].append(sum(len(msg.get('content') or '') for msg in messages))
+            if len(columns['id']) >= PARQUET_ROW_GROUP_SIZE:
+                flush(writer)
+        flush(writer)
+
+# 열려 있는 바이너리 파일(target)에 조각을 이어 씁니다. 압축 묶음은 쓰면서 gzip으로 압축합니다.
+def write_diary_export(target, export_format="text", include_transcripts=False):
+    try:
+        if export_format == "parquet":
+            if pa is None:
+                print("데이터 내보내기 오류: Parquet로 내보내려면 pyarrow가 필요해요.")
+                return False
+            write_parquet_export(target, include_transcripts)
+        elif export_format == "bundle":
+            with gzip.GzipFile(fileobj=target, mode='wb') as f:
+                for chunk in iter_export_chunks(export_format, include_transcripts):
+                    f.write(chunk.encode('utf-8'))
+        else:
+            for chunk in iter_export_chunks(export_format, include_transcripts):
+                target.write(chunk.encode('utf-8'))
+        return True
+    except Exception as e:
+        print(f"데이터 내보내기 오류: {e}")
+        return False
+
+# 내보낼 내용을 EXPORT_DIR에 조각 단위로 바로 씁니다. 메모리에는 한 조각만 올라갑니다.
+# 다 쓴 뒤에 이름을 바꾸므로 쓰는 중인 파일이 링크로 나가지 않습니다. 내려받을 URL 경로를 돌려주고, 실패하면 None
+def create_export_file(export_format="text", include_transcripts=False):
+    partial_path = None
+    try:
+        prune_export_files()
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        name = f"{secrets.token_urlsafe(24)}.{EXPORT_FORMATS[export_format]['extension']}"
+        partial_path = os.path.join(EXPORT_DIR, f".{name}.partial")
+        with open(partial_path, 'wb') as f:
+            if not write_diary_export(f, export_format, include_transcripts):
+                return None
+        os.replace(partial_path, os.path.join(EXPORT_DIR, name))
+        partial_path = None
+        return f"{EXPORT_URL_PATH}/{name}"
+    except Exception as e:
+        print(f"데이터 내보내기 오류: {e}")
+        return None
+    finally:
+        if partial_path and os.path.exists(partial_path):
+            os.remove(partial_path)
+
+# 홈 목록/휴지통은 키셋 페이지 단위로만 불러옵니다.
+PAGER_KEYS = ["home_diary_pager", "trash_pager"]
+
+def get_pager(pager_key, fetch_page, page_size):
+    pager = st.session_state.get(pager_key)
+    if pager is None:
+        entries, next_cursor = fetch_page(limit=page_size)
+        pager = {"entries": entries, "cursor": next_cursor}
+        st.session_state[pager_key] = pager
+    return pager
+
+def load_next_page(pager_key, fetch_page, page_size):
+    pager = get_pager(pager_key, fetch_page, page_size)
+    if pager["cursor"] is not None:
+        entries, next_cursor = fetch_page(before=pager["cursor"], limit=page_size)
+        pager["entries"].extend(entries)
+        pager["cursor"] = next_cursor
+    return pager
+
+def reset_pagers():
+    for key in PAGER_KEYS:
+        if key in st.session_state:
+            del st.session_state[key]
+
+def remove_entries_by_id(entries, ids):
+    ids = set(ids)
+    return [entry for entry in entries if entry.get('id') not in ids]
+
+# diary_entries는 (date, time, id) 순서를 유지하므로 이진 탐색으로 끼워 넣습니다.
+def insert_diary_sorted(diary_entries, diary_entry):
+    key = (diary_entry['date'], diary_entry['time'], diary_entry['id'])
+    low, high = 0, len(diary_entries)
+    while low < high:
+        mid = (low + high) // 2
+        entry = diary_entries[mid]
+        if (entry['date'], entry['time'], entry.get('id', 0)) < key:
+            low = mid + 1
+        else:
+            high = mid
+    diary_entries.insert(low, diary_entry)
+
+def reload_session_entries():
+    st.session_state.diary_entries = load_diaries_from_db()
+    st.session_state.deleted_entries = load_deleted_entries_from_db()
+    st.session_state.archive_summary = load_archive_summary_from_db()
+
+# 세션 목록(diary_entries)에는 보관소로 옮겨지지 않은 최근 일기만 있으므로, 전체 개수는 보관된 개수를 더해서 셉니다.
+def total_diary_count():
+    return len(st.session_state.diary_entries) + st.session_state.get('archive_summary', empty_archive_summary())['count']
+
+# 변경 기록에 나온 일기/휴지통 id만 DB에서 다시 읽어서 세션 목록의 그 항목들만 바꿔 끼웁니다.
+# (없어진 항목은 빠지고, 새로 생기거나 복원된 항목은 제자리에 들어갑니다) 실패하면 False
+def apply_events_to_session(events):
+    diary_ids = {event['diary_id'] for event in events if event['diary_id'] is not None}
+    trash_ids = {event['trash_id'] for event in events if event['trash_id'] is not None}
+    
+    diaries = load_diaries_by_ids_from_db(diary_ids) if diary_ids else []
+    trash_entries = load_deleted_entries_by_ids_from_db(trash_ids) if trash_ids else []
+    if diaries is None or trash_entries is None:
+        return False
+    
+    diary_entries = remove_entries_by_id(st.session_state.diary_entries, diary_ids)
+    for diary in diaries:
+        insert_diary_sorted(diary_entries, diary)
+    st.session_state.diary_entries = diary_entries
+    
+    # 변경 기록에 나온 휴지통 항목은 모두 새로 생긴 것이라 휴지통 목록(최신순) 맨 앞에 붙입니다.
+    trash_entries.sort(key=lambda entry: entry['id'], reverse=True)
+    st.session_state.deleted_entries = trash_entries + remove_entries_by_id(st.session_state.deleted_entries, trash_ids)
+    return True
+
+# 다른 탭/기기, 백그라운드 정리, 그리고 이 세션 자신이 바꾼 내용을 변경 기록(diary_events)으로 세션에 반영합니다.
+# 먼저 변경 기록의 마지막 seq(load_change_marker_from_db)로 그사이 일기가 바뀌었는지 보고, 그대로면 더 읽지 않고 끝냅니다.
+# 바뀌었으면 이 세션이 마지막으로 본 seq(event_seq) 뒤의 기록만 읽어서 그 항목들만 고치고,
+# 기록이 너무 많이 밀렸거나(DIARY_EVENT_APPLY_LIMIT개 초과), 필요한 기록이 이미 정리됐거나,
+# 백업 복원(reset)이나 보관소로 옮긴(archive) 기록이 있으면 전체를 다시 불러옵니다. 세션 목록이 바뀌었으면 True
+def sync_session_entries():
+    marker = load_change_marker_from_db()
+    if marker is not None and marker == st.session_state.get('db_change_marker'):
+        return False
+    
+    first_seq, last_seq = load_event_range_from_db()
+    position = st.session_state.get('event_seq', 0)
+    events = load_diary_events_from_db(position, DIARY_EVENT_APPLY_LIMIT + 1) if last_seq > position else []
+    
+    if (
+        events is None
+        or len(events) > DIARY_EVENT_APPLY_LIMIT
+        or position < first_seq - 1
+        or any(event['event'] in ("reset", "archive") for event in events)
+        or not apply_events_to_session(events)
+    ):
+        reload_session_entries()
+        events = events or []
+        changed = True
+    else:
+        changed = bool(events)
+    
+    st.session_state.event_seq = max([last_seq] + [event['seq'] for event in events])
+    st.session_state.db_change_marker = marker
+    if changed:
+        reset_pagers()
+    return changed
+
+def save_diary(diary_entry):
+    try:
+        if not save_diary_to_db(diary_entry):
+            return False
         
-        return export_text
+        # 대화 내용은 DB에만 두고 세션에는 목록에 필요한 필드만 남깁니다.
+        diary_entry.pop('chat_messages', None)
+        diary_entry.pop('draft_id', None)
+        st.session_state.draft_id = None
+        sync_session_entries()
+        return True
     except Exception as e:
-        return f"❌ 데이터 내보내기 중 문제가 생겼어요: {str(e)}"
+        print(f"일기 저장 오류: {e}")
+        return False
 
 def move_to_trash(diary_entry):
+    return move_many_to_trash([diary_entry]) > 0
+
+def restore_from_trash(trash_entry):
+    return restore_many_from_trash([trash_entry]) > 0
+
+def permanent_delete_from_trash(trash_entry):
+    return permanent_delete_many_from_trash([trash_entry]) > 0
+
+def move_many_to_trash(diary_entries):
     try:
-        if delete_diary_from_db(diary_entry):
-            st.session_state.diary_entries = load_diaries_from_db()
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
-            return True
-        return False
+        new_trash_entries = delete_diaries_from_db([entry['id'] for entry in diary_entries])
+        if new_trash_entries:
+            sync_session_entries()
+        return len(new_trash_entries)
     except Exception as e:
         print(f"일기 삭제 오류: {e}")
+        return 0
+
+# 보관된 일기까지 모두 휴지통으로 옮깁니다.
+def move_all_to_trash():
+    diary_entries = [entry for kind, entries in iter_export_pages(include_trash=False) for entry in entries]
+    return move_many_to_trash(diary_entries)
+
+def restore_many_from_trash(trash_entries):
+    try:
+        restored_diaries = restore_many_from_trash_db([entry['id'] for entry in trash_entries])
+        if restored_diaries:
+            sync_session_entries()
+        return len(restored_diaries)
+    except Exception as e:
+        print(f"일기 복원 오류: {e}")
+        return 0
+
+def permanent_delete_many_from_trash(trash_entries):
+    try:
+        deleted_ids = permanent_delete_many_from_trash_db([entry['id'] for entry in trash_entries])
+        if deleted_ids:
+            sync_session_entries()
+        return len(deleted_ids)
+    except Exception as e:
+        print(f"영구 삭제 오류: {e}")
+        return 0
+
+def empty_trash():
+    try:
+        deleted_count = empty_trash_db()
+        if deleted_count:
+            sync_session_entries()
+        return deleted_count
+    except Exception as e:
+        print(f"휴지통 비우기 오류: {e}")
+        return 0
+
+# 화면을 다시 그릴 때마다(app.py) 불러서 다른 곳에서 생긴 변경을 반영합니다.
+def refresh_session_entries_if_stale():
+    try:
+        sync_session_entries()
+        return True
+    except Exception as e:
+        print(f"세션 동기화 오류: {e}")
         return False
 
-def restore_from_trash(trash_entry):
+# 업로드한 파일은 메모리에 있으므로 임시 파일로 써 두고 가져옵니다. (백업 파일은 sqlite3로 열어야 해서)
+def import_diary_file(uploaded_file):
+    temp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as f:
+            f.write(uploaded_file.getbuffer())
+            temp_path = f.name
+        
+        result = import_diaries_db(temp_path)
+        if result is not None:
+            sync_session_entries()
+        return result
+    except Exception as e:
+        print(f"일기 가져오기 오류: {e}")
+        return None
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+# 진행 중인 대화는 한 턴이 오갈 때마다 그 턴의 메시지만 임시 대화(draft)로 DB에 추가해 둡니다.
+# 서버가 재시작되거나 연결이 끊겨도 다음 로그인 때 이어서 할 수 있고,
+# 일기로 저장하면 임시 대화가 그대로 일기의 대화 내용으로 옮겨집니다.
+def save_chat_turn(new_messages):
     try:
-        if restore_from_trash_db(trash_entry):
-            st.session_state.diary_entries = load_diaries_from_db()
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
+        messages = st.session_state.chat_messages
+        draft_id = st.session_state.get('draft_id')
+        if draft_id is not None and append_draft_messages_db(draft_id, len(messages) - len(new_messages), new_messages):
             return True
+        
+        # 첫 턴이거나 임시 대화가 어긋났으면(다른 탭에서 새로 시작 등) 지금까지의 대화 전체로 새로 만듭니다.
+        st.session_state.draft_id = start_draft_db(st.session_state.current_mood, messages)
+        return st.session_state.draft_id is not None
+    except Exception as e:
+        print(f"대화 저장 오류: {e}")
         return False
+
+def discard_chat_draft():
+    st.session_state.draft_id = None
+    return discard_draft_db()
+
+# 일기로 저장하지 못한 대화가 있으면 그 대화 화면으로 되돌려 놓습니다.
+def resume_chat_draft():
+    try:
+        draft = load_draft_from_db()
+        if not draft or not draft['messages']:
+            return False
+        
+        st.session_state.draft_id = draft['id']
+        st.session_state.chat_messages = draft['messages']
+        st.session_state.current_mood = draft['mood']
+        st.session_state.current_step = "chat"
+        st.session_state.draft_resumed = True
+        return True
     except Exception as e:
-        print(f"일기 복원 오류: {e}")
+        print(f"대화 이어하기 오류: {e}")
         return False
 
-def permanent_delete_from_trash(trash_entry):
+# 기분 버튼 링크는 새 세션으로 열려서 user 파라미터만 믿으면 아무나 남의 일기장을 열 수 있습니다.
+# 그래서 일기장 이름과 만료 시각을 서버만 아는 키로 서명(HMAC)해 함께 넘기고, 서명이 맞을 때만 로그인합니다.
+fallback_link_secret = secrets.token_bytes(32)
+
+def get_link_secret():
+    secret = os.environ.get(LINK_SECRET_ENV)
+    if not secret:
+        try:
+            secret = st.secrets.get("LINK_SECRET")
+        except Exception:
+            secret = None
+    return secret.encode('utf-8') if secret else fallback_link_secret
+
+def mood_link_signature(user_id, expires):
+    return hmac.new(get_link_secret(), f"{user_id}:{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+def sign_mood_link(user_id):
+    expires = int(time.time()) + MOOD_LINK_TTL_SECONDS
+    return f"{expires}.{mood_link_signature(normalize_user_id(user_id), expires)}"
+
+def verify_mood_link(user_id, token):
     try:
-        if permanent_delete_from_trash_db(trash_entry):
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
-            return True
+        expires, signature = str(token).split(".", 1)
+        if int(expires) < time.time():
+            return False
+        return hmac.compare_digest(signature, mood_link_signature(normalize_user_id(user_id), int(expires)))
+    except Exception:
         return False
+
+# 일기장 이름과 비밀번호를 확인합니다. 이름을 비워 둔 공용 일기장만 예전처럼 APP_PASSWORD로 들어갑니다.
+def authenticate_user(name, password):
+    try:
+        user_id = normalize_user_id(name)
+        if user_id == DEFAULT_USER_ID:
+            return hmac.compare_digest(password.strip(), APP_PASSWORD)
+        password_hash = load_password_hash_from_db(user_id)
+        return password_hash is not None and verify_password(password, password_hash)
     except Exception as e:
-        print(f"영구 삭제 오류: {e}")
+        print(f"로그인 확인 오류: {e}")
         return False
 
-def clean_expired_trash():
+# 아직 비밀번호가 없는 이름에 비밀번호를 정해서 일기장을 만듭니다. (앱 비밀번호 확인은 화면에서 먼저 합니다)
+# 비밀번호가 생기기 전부터 쓰던 일기장은 처음 비밀번호를 정한 사람이 이어서 씁니다. 이미 있는 이름이면 False
+def register_user(name, password):
     try:
-        if clean_expired_trash_db():
-            st.session_state.deleted_entries = load_deleted_entries_from_db()
+        user_id = normalize_user_id(name)
+        if user_id == DEFAULT_USER_ID or len(password) < DIARY_PASSWORD_MIN_LENGTH:
+            return False
+        return save_password_hash_to_db(user_id, hash_password(password))
+    except Exception as e:
+        print(f"일기장 만들기 오류: {e}")
+        return False
+
+# 일기장 이름으로 로그인하고, 그 사용자의 일기/휴지통/설정만 세션에 불러옵니다.
+# resume_draft가 True면 저장하지 못한 대화도 이어서 보여줍니다.
+def login_user(name, resume_draft=True):
+    try:
+        st.session_state.user_id = normalize_user_id(name)
+        st.session_state.authenticated = True
+        st.session_state.draft_id = None
+        load_data_from_db()
+        reset_pagers()
+        if resume_draft:
+            resume_chat_draft()
         return True
     except Exception as e:
-        print(f"휴지통 정리 오류: {e}")
-        return False
\ No newline at end of file
+        print(f"로그인 오류: {e}")
+        return False